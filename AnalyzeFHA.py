@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+Derived series from the extracted FHA tables
+
+Computes, per report month,
+  * annualized prepayment and claim rates (Table 1: prepay_b, claims_b over insurance_beg_b),
+  * year-over-year endorsement growth (Table 1: endorsements_k, endorsemenst_b),
+  * purchase/refinance mix and its 12-month trend (Table 4).
+
+Results are cached in output/fha_data_analytics.csv. On each run only months
+from the earliest one that is missing from the cache, or whose Table 4 (or
+Table 1 rate) inputs changed, onward are computed (normally just the new
+report), using the previous 12 months as lookback.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+
+# Months of history needed before a new month (YoY and 12-month rolling windows)
+LOOKBACK = 12
+
+TAB1_COLUMNS = ['insurance_beg_b', 'prepay_b', 'claims_b', 'endorsements_k', 'endorsemenst_b']
+TAB4_COLUMNS = ['total_endorsement_count', 'purchase_loan_count', 'refinance_loan_count',
+                'purchase_pct', 'refinance_pct']
+
+ANALYTICS_COLUMNS = [
+    'date',
+    'prepay_rate_ann', 'claims_rate_ann',
+    'endorsements_k_yoy', 'endorsements_b_yoy',
+    'purchase_pct', 'refinance_pct',
+    'purchase_pct_12m', 'refinance_pct_12m', 'purchase_pct_yoy_chg',
+    'purchase_count_share', 'refinance_count_share'
+]
+
+# Columns that depend only on the same month's inputs; comparing them with the
+# cache shows which cached months had their inputs changed (e.g. backfilled)
+ROW_COLUMNS = ['prepay_rate_ann', 'claims_rate_ann', 'purchase_pct', 'refinance_pct',
+               'purchase_count_share', 'refinance_count_share']
+
+
+def build_monthly(df1, df4):
+    """
+    Merge the raw Table 1 and Table 4 inputs on report month into one numeric
+    frame on a complete monthly index (months without a report are NaN).
+    Also returns the set of months that have a report.
+    """
+    frames = []
+    for df, columns in ((df1, TAB1_COLUMNS), (df4, TAB4_COLUMNS)):
+        if df is None or df.empty or 'date' not in df.columns:
+            frames.append(pd.DataFrame(columns=columns, index=pd.PeriodIndex([], freq='M', name='date'),
+                                       dtype=float))
+            continue
+        part = df.reindex(columns=['date'] + columns).copy()
+        part['date'] = pd.to_datetime(part['date']).dt.to_period('M')
+        part = part.dropna(subset=['date']).drop_duplicates('date', keep='last').set_index('date')
+        frames.append(part.apply(pd.to_numeric, errors='coerce'))
+
+    monthly = frames[0].join(frames[1], how='outer')
+    reported = monthly.index
+    if len(monthly):
+        full = pd.period_range(monthly.index.min(), monthly.index.max(), freq='M')
+        monthly = monthly.reindex(full)
+
+    return monthly, reported
+
+
+def compute_monthly_rates(monthly):
+    """
+    The ROW_COLUMNS derivations, which need no history.
+    """
+    out = pd.DataFrame(index=monthly.index)
+
+    # Monthly rate compounded to an annual rate: 1 - (1 - m)^12
+    beg = monthly['insurance_beg_b'].where(monthly['insurance_beg_b'] > 0)
+    for col, name in (('prepay_b', 'prepay_rate_ann'), ('claims_b', 'claims_rate_ann')):
+        smm = np.abs(monthly[col]) / beg
+        out[name] = 1 - np.power(1 - smm, 12)
+
+    out['purchase_pct'] = monthly['purchase_pct']
+    out['refinance_pct'] = monthly['refinance_pct']
+
+    total = monthly['total_endorsement_count'].where(monthly['total_endorsement_count'] > 0)
+    out['purchase_count_share'] = monthly['purchase_loan_count'] / total
+    out['refinance_count_share'] = monthly['refinance_loan_count'] / total
+
+    return out
+
+
+def compute_analytics(monthly):
+    """
+    Vectorized derivations over a monthly frame from build_monthly.
+    Rows need LOOKBACK months of history for the YoY and rolling columns.
+    """
+    out = compute_monthly_rates(monthly)
+
+    # Shift by position on the complete monthly index, so missing months stay missing
+    for col, name in (('endorsements_k', 'endorsements_k_yoy'), ('endorsemenst_b', 'endorsements_b_yoy')):
+        prior = monthly[col].shift(LOOKBACK)
+        out[name] = monthly[col] / prior.where(prior != 0) - 1
+
+    # Allow a few missing reports within the 12-month window
+    out['purchase_pct_12m'] = monthly['purchase_pct'].rolling(LOOKBACK, min_periods=LOOKBACK // 2).mean()
+    out['refinance_pct_12m'] = monthly['refinance_pct'].rolling(LOOKBACK, min_periods=LOOKBACK // 2).mean()
+    out['purchase_pct_yoy_chg'] = monthly['purchase_pct'] - monthly['purchase_pct'].shift(LOOKBACK)
+
+    return out[ANALYTICS_COLUMNS[1:]]
+
+
+def changed_months(monthly, cached):
+    """
+    Cached months whose ROW_COLUMNS no longer match the current inputs.
+    """
+    cached_rows = cached.set_index(pd.PeriodIndex(cached['date'], freq='M'))[ROW_COLUMNS]
+    months = cached_rows.index.intersection(monthly.index)
+    current = compute_monthly_rates(monthly.loc[months])[ROW_COLUMNS]
+
+    same = np.isclose(current.to_numpy(dtype=float), cached_rows.loc[months].to_numpy(dtype=float),
+                      equal_nan=True).all(axis=1)
+    return months[~same]
+
+
+def load_analytics(cache_file):
+    """
+    Load cached analytics, or an empty frame if missing or from an older layout.
+    """
+    if not os.path.exists(cache_file):
+        return pd.DataFrame(columns=ANALYTICS_COLUMNS)
+
+    cached = pd.read_csv(cache_file, float_precision='round_trip')
+    if list(cached.columns) != ANALYTICS_COLUMNS:
+        print(f"  Warning: {cache_file} has different columns, recomputing all months")
+        return pd.DataFrame(columns=ANALYTICS_COLUMNS)
+
+    cached['date'] = pd.to_datetime(cached['date'])
+    return cached
+
+
+def update_analytics(out_path, df1, df4, output_file="fha_data", full=False):
+    """
+    Compute derived series from the earliest month that is not yet in the
+    cache or whose inputs changed (e.g. the new report, or Table 4 values
+    backfilled or revised by ReviseFHA) onward, and save. Set full=True to
+    recompute the whole history, e.g. after Table 1 endorsement restatements,
+    which only feed the YoY columns and are not detected.
+    """
+    cache_file = out_path + output_file + "_analytics.csv"
+    monthly, reported = build_monthly(df1, df4)
+
+    if monthly.empty:
+        print("No data for analytics.")
+        return None
+
+    cached = pd.DataFrame(columns=ANALYTICS_COLUMNS) if full else load_analytics(cache_file)
+
+    if cached.empty:
+        new_months = reported
+        window = monthly
+    else:
+        missing = reported.difference(pd.PeriodIndex(cached['date'], freq='M'))
+        stale = missing.union(changed_months(monthly, cached))
+        if len(stale) == 0:
+            print(f"\nAnalytics up to date through {cached['date'].max():%Y-%m}.")
+            return cached
+        # Later months depend on the stale one through YoY and rolling windows
+        first = stale.min()
+        new_months = reported[reported >= first]
+        cached = cached[cached['date'] < first.to_timestamp()]
+        window = monthly.loc[first - LOOKBACK:]
+
+    derived = compute_analytics(window).loc[new_months.sort_values()]
+    derived.index = derived.index.to_timestamp()
+    derived = derived.rename_axis('date').reset_index()[ANALYTICS_COLUMNS]
+
+    analytics = derived if cached.empty else pd.concat([cached, derived], ignore_index=True)
+    analytics = analytics.sort_values('date').reset_index(drop=True)
+
+    analytics.to_csv(cache_file, index=False, date_format='%Y-%m-%d')
+    print(f"\nAnalytics computed for {len(derived)} months, saved to: {cache_file}")
+
+    return analytics
+
+
+if __name__ == "__main__":
+    # Recompute from the saved tables without re-parsing the PDFs
+    df1 = pd.read_csv("./output/fha_data_tab1.csv")
+    df4 = pd.read_csv("./output/fha_data_tab4.csv")
+    update_analytics("./output/", df1, df4, full=True)
@@ -12,54 +12,357 @@ import re
 from pathlib import Path
 from datetime import datetime
 from datetime import date
+from AnalyzeFHA import update_analytics
+from StateFHA import load_json, save_json, file_sha256, PARSED_CACHE
+from ReviseFHA import update_period_index
+
+# Month names as they appear in report filenames and on the cover page.
+# Compiled once at import; longer spellings come first so 'june' wins over 'jun'.
+MONTH_MAP = {
+    'jan': 1, 'january': 1,
+    'feb': 2, 'february': 2,
+    'mar': 3, 'march': 3,
+    'apr': 4, 'april': 4,
+    'may': 5,
+    'jun': 6, 'june': 6,
+    'jul': 7, 'july': 7,
+    'aug': 8, 'august': 8,
+    'sep': 9, 'sept': 9, 'september': 9,
+    'oct': 10, 'october': 10,
+    'nov': 11, 'november': 11,
+    'dec': 12, 'december': 12
+}
+_MONTH_ALT = '|'.join(sorted(MONTH_MAP, key=len, reverse=True))
+
+# Month token immediately followed by the year, e.g. Dec2021, Dec_2021, June2021, -Sept2025
+FILENAME_DATE_RE = re.compile(r'(' + _MONTH_ALT + r')[_-]?((?:19|20)\d{2})', re.IGNORECASE)
+
+# Full month name and year on the cover page, e.g. "December 2021"
+COVER_DATE_RE = re.compile(
+    r'\b(january|february|march|april|may|june|july|august|september|october|november|december)'
+    r'\s*,?\s*((?:19|20)\d{2})\b',
+    re.IGNORECASE)
+
+# Release date in a filename, e.g. prorepma2013ext20130718.pdf
+RELEASE_DATE_RE = re.compile(r'((?:19|20)\d{2})(\d{2})(\d{2})')
+
+# Month column headers in Table 4, e.g. "Dec 2021", "Nov-21", "October 2021"
+PERIOD_RE = re.compile(r'\b(' + _MONTH_ALT + r')\.?[\s_/-]*\'?(\d{4}|\d{2})\b', re.IGNORECASE)
+
+DATE_MANIFEST = "date_manifest.json"
+
+# Published column order of the output CSVs: date, filename, then metrics in parse order
+TAB1_COLUMNS = [
+    'date', 'filename',
+    'insurance_beg_k', 'insurance_beg_b', 'prepay_k', 'prepay_b', 'refi_fha_k', 'refi_fha_b',
+    'payoff_k', 'payoff_b', 'claims_k', 'claims_b', 'conveyance_k', 'conveyance_b',
+    'pre_foreclosure_sale_k', 'pre_foreclosure_sale_b', 'note_sale_k', 'note_sale_b',
+    'third_party_sale_k', 'third_party_sale_b', 'endorsements_k', 'endorsemenst_b',
+    'adjustment_k', 'adjustment_b', 'insurance_end_k', 'insurance_end_b'
+]
+TAB3_COLUMNS = ['date', 'filename'] + [
+    section + suffix
+    for section in ('insurance_beg', 'prepayment', 'claims', 'endorsements', 'adjustment', 'insurance_end')
+    for suffix in ('_tot_k', '_tot_b', '_pi_k', '_pi_b', '_mh_k', '_mh_b')
+]
+TAB4_COLUMNS = [
+    'date', 'filename',
+    'total_endorsement_count', 'purchase_pct', 'refinance_pct', 'purchase_loan_count',
+    'first_time_homebuyer_pct', '203k_pct', 'minority_pct', 'non_minority_pct',
+    'undisclosed_race_pct', 'refinance_loan_count', 'fha_streamline_pct',
+    'fha_to_fha_pct', 'fha_to_fha_noncash_pct', 'fha_to_fha_cashout_pct',
+    'conv_to_fha_pct', 'conv_to_fha_noncash_pct', 'conv_to_fha_cashout_pct',
+    'single_family_detached_pct', 'townhome_pct', 'condominium_pct', '2_4_unit_pct',
+    'manufactured_housing_pct'
+]
+
+# Bump whenever parsing changes, so results in the parsed cache are recomputed
+PARSER_VERSION = 5
+
 
 def extract_date_from_filename(filename):
     """
     Extract date from FHA report filename.
     Examples: FHAProdReport_Dec2021.pdf -> 2021-12-01
+              FHAProd-Sept2025.pdf      -> 2025-09-01
+    Returns None when the filename has no month/year token (e.g. prorepma2013ext20130718.pdf).
+    """
+    match = FILENAME_DATE_RE.search(filename)
+    if match:
+        month_num = MONTH_MAP[match.group(1).lower()]
+        return datetime(int(match.group(2)), month_num, 1)
+
+    return None
+
+
+def cover_text(pages):
+    """
+    Text of the cover page tables, one line per row. Empty cells are skipped,
+    so a date split over several cells ("May", NaN, "2013") reads "May 2013".
+    """
+    lines = []
+    for page in pages:
+        for row in page.itertuples(index=False):
+            cells = [str(cell).strip() for cell in row if not pd.isna(cell)]
+            line = ' '.join(cell for cell in cells if cell)
+            if line:
+                lines.append(line)
+    return '\n'.join(lines)
+
+
+def read_cover_text(pdf_path):
+    """
+    Read the text on the first page of the PDF, or None if it can't be read.
+    """
+    try:
+        pages = tabula.read_pdf(
+            pdf_path,
+            pages=1,
+            guess=False,
+            stream=True,
+            multiple_tables=True,
+            pandas_options={'header': None},
+            encoding='latin-1',
+            silent=True
+        )
+    except Exception as e:
+        print(f"  Warning: could not read cover page of {os.path.basename(pdf_path)}: {e}")
+        return None
+
+    return cover_text(pages)
+
+
+def extract_release_date(filename):
+    """
+    Release date embedded in a filename as yyyymmdd, e.g.
+    prorepma2013ext20130718.pdf -> 2013-07-18. None if there is none.
+    """
+    for match in RELEASE_DATE_RE.finditer(filename):
+        try:
+            return datetime(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+        except ValueError:
+            continue
+    return None
+
+
+def extract_date_from_cover_text(text, filename=''):
+    """
+    Pick the report month from cover page text.
+
+    Months on the report title line (a line mentioning "report") are preferred
+    over the rest of the page. With a release date in the filename the latest
+    month that ended before it is taken, so a range like "October 2012 - May 2013"
+    gives May 2013; without one the month must be unambiguous.
+    Example: "... Production Report, May 2013" -> 2013-05-01
+    """
+    if not text:
+        return None
+
+    lines = text.splitlines()
+    title_lines = [line for line in lines if 'report' in line.lower() and COVER_DATE_RE.search(line)]
+    candidates = sorted({
+        datetime(int(match.group(2)), MONTH_MAP[match.group(1).lower()], 1)
+        for line in (title_lines or lines)
+        for match in COVER_DATE_RE.finditer(line)
+    })
+
+    release = extract_release_date(filename)
+    if release is not None:
+        candidates = [d for d in candidates if d < datetime(release.year, release.month, 1)]
+        return candidates[-1] if candidates else None
+
+    if len(candidates) > 1:
+        print(f"  Warning: cover page of {filename} has several months: "
+              f"{', '.join(d.strftime('%Y-%m') for d in candidates)}")
+        return None
+    return candidates[0] if candidates else None
+
+
+def extract_date_from_cover(pdf_path):
+    """
+    Read the report month from the text on the first page of the PDF.
+    """
+    return extract_date_from_cover_text(read_cover_text(pdf_path), os.path.basename(pdf_path))
+
+
+def load_date_manifest(pdf_path):
+    """
+    Load the cached filename -> report date manifest from the PDF directory.
+    """
+    return load_json(Path(pdf_path) / DATE_MANIFEST)
+
+
+def save_date_manifest(pdf_path, manifest):
+    """
+    Write the filename -> report date manifest to the PDF directory.
+    """
+    save_json(Path(pdf_path) / DATE_MANIFEST, manifest)
+
+
+def resolve_report_date(pdf_path, manifest=None):
+    """
+    Resolve the report month for a PDF, once per file.
+
+    Order: cached manifest entry (same file size; cover dates only from the
+    current PARSER_VERSION), then the filename, then the cover page text.
+    The resolved date is written back into the manifest.
+    """
+    filename = os.path.basename(pdf_path)
+    size = os.path.getsize(pdf_path)
+
+    if manifest is not None:
+        entry = manifest.get(filename)
+        if (entry and entry.get('size') == size and entry.get('date')
+                and (entry.get('source') != 'cover' or entry.get('parser') == PARSER_VERSION)):
+            return datetime.strptime(entry['date'], '%Y-%m-%d')
+
+    source = 'filename'
+    fndate = extract_date_from_filename(filename)
+    if fndate is None:
+        source = 'cover'
+        fndate = extract_date_from_cover(pdf_path)
+
+    if fndate is None:
+        print(f"  Warning: could not determine report date for {filename}")
+    elif manifest is not None:
+        manifest[filename] = {'size': size, 'date': fndate.strftime('%Y-%m-%d'), 'source': source,
+                              'parser': PARSER_VERSION}
+
+    return fndate
+
+
+def read_pdf_tables(pdf_path):
     """
-    # Try various filename patterns
-    patterns = [
-        r'(\w{3})(\d{4})',  # Dec2021
-        r'(\w{4})(\d{4})',  # June2021
-        r'(\w{3})_(\d{4})', # Dec_2021
-        r'([a-zA-Z]+)(\d{4})'    # December2021
-    ]
+    Run tabula over a single PDF in both lattice (default) and stream mode.
+    Returns (tables, tables_stream), the raw lists of DataFrames.
+    """
+    # Extract all tables from the PDF
+    # Try UTF-8 first, then fall back to cp1252 if that fails
+    encodings = ['utf-8', 'cp1252', 'latin-1']
+    tables = None
+    tables_stream = None
     
-    for pattern in patterns:
-        match = re.search(pattern, filename)
-        if match:
-            month_str = match.group(1)
-            year = match.group(2)
-            
-            # Convert month name to number
-            month_map = {
-                'jan': 1, 'january': 1,
-                'feb': 2, 'february': 2,
-                'mar': 3, 'march': 3,
-                'apr': 4, 'april': 4,
-                'may': 5,
-                'jun': 6, 'june': 6,
-                'jul': 7, 'july': 7,
-                'aug': 8, 'august': 8,
-                'sep': 9, 'sept': 9, 'september': 9,
-                'oct': 10, 'october': 10,
-                'nov': 11, 'november': 11,
-                'dec': 12, 'december': 12
-            }
-            
-            month_num = month_map.get(month_str.lower())
-            
-            if filename == 'prorepma2013ext20130718.pdf':   # special treatment for typo
-                month_num = 5
-            
-            if month_num:
-                return datetime(int(year), month_num, 1)
+    for encoding in encodings:
+        try:
+            tables_stream = tabula.read_pdf(
+                pdf_path,
+                pages='all',
+                multiple_tables=True,
+                pandas_options={'header': None},
+                encoding=encoding,
+                silent=True,
+                stream=True
+            )
+            break  # Success! Stop trying other encodings
+        except UnicodeDecodeError:
+            continue  # Try next encoding
+        except Exception as e:
+            # Some other error, not encoding-related
+            raise e
     
-    return None
+    if tables_stream is None:
+        raise Exception("Could not read PDF with any encoding")
+
+    for encoding in encodings:
+        try:
+            tables = tabula.read_pdf(
+                pdf_path,
+                pages='all',
+                multiple_tables=True,
+                pandas_options={'header': None},
+                encoding=encoding,
+                silent=True
+            )
+            break  # Success! Stop trying other encodings
+        except UnicodeDecodeError:
+            continue  # Try next encoding
+        except Exception as e:
+            # Some other error, not encoding-related
+            raise e
+    
+    if tables is None:
+        raise Exception("Could not read PDF with any encoding")
+
+    return tables, tables_stream
 
 
-def extract_tables_from_pdf(pdf_path):
+def parse_pdf_tables(pdf_path, fndate, tables, tables_stream, prior_values=None):
+    """
+    Identify Tables 1, 3 and 4 among the raw tabula output and parse them into
+    one dict per table. Split from the tabula call so cached tabula output can
+    be replayed without Java (see RegressFHA.py).
+    Prior-period values from Table 4 are appended to prior_values if given.
+    """
+    # Identify tables by looking for identifying text
+    table1_df = None
+    table3_df = None
+    table4_df = None
+    
+    
+    for i, table in enumerate(tables):
+        # Convert first few rows to string to search
+        table_text = table.to_string().lower()
+
+        # Look for Table 1 identifiers
+        if 'refinance with fha' in table_text and 'delinquency' not in table_text:
+            table1_df = table.copy()
+         
+        # Look for Table 3 identifiers
+        if 'property improvement' in table_text:
+            table3_df = table.copy()
+            break
+
+    # Stream works better for table 4                
+    for i, table in enumerate(tables_stream):
+        # Convert first few rows to string to search
+        table_text = table.to_string().lower()
+
+        # Look for Table 4 identifiers
+        if 'first-time homebuyer' in table_text or 'first time homebuyer' in table_text:
+            table4_df = table.copy()
+            break
+    
+    if table1_df is None:
+        print(f"  Warning: Table 1 not found in {os.path.basename(pdf_path)}")
+
+    if table3_df is None:
+        print(f"  Warning: Table 3 not found in {os.path.basename(pdf_path)}")
+
+    if table4_df is None:
+        print(f"  Warning: Table 4 not found in {os.path.basename(pdf_path)}")
+    
+    # Clean the dataframes
+    if table1_df is not None:
+        table1_df = table1_df.dropna(how='all')  # Remove empty rows
+    if table3_df is not None:
+        table3_df = table3_df.dropna(how='all')  # Remove empty rows
+    if table4_df is not None:
+        table4_df = table4_df.dropna(how='all')  # Remove empty rows
+    
+    # Parse the table structure
+    data_dict1 = {'date': fndate, 'filename': os.path.basename(pdf_path)}
+    data_dict3 = data_dict1.copy()
+    data_dict4 = data_dict1.copy()
+    
+    if table1_df is not None:
+        data_dict1 = extract_table1_from_pdf(data_dict1, table1_df, pdf_path)
+    else:
+        data_dict1 = None
+        
+    if table3_df is not None:
+        data_dict3 = extract_table3_from_pdf(data_dict3, table3_df, pdf_path)
+    else:
+        data_dict3 = None
+        
+    if table4_df is not None:
+        data_dict4 = extract_table4_from_pdf(data_dict4, table4_df, pdf_path, prior_values)
+    else:
+        data_dict4 = None
+
+    return data_dict1, data_dict3, data_dict4
+
+
+def extract_tables_from_pdf(pdf_path, date_manifest=None, prior_values=None):
     """
     Extract 
             Table 1 (Single Family Insured Mortgage Portfolio Change during Month),
@@ -69,123 +372,12 @@ def extract_tables_from_pdf(pdf_path):
     """
 
     try:
-        # Extract all tables from the PDF
-        # Try UTF-8 first, then fall back to cp1252 if that fails
-        encodings = ['utf-8', 'cp1252', 'latin-1']
-        tables = None
-        
-        for encoding in encodings:
-            try:
-                tables_stream = tabula.read_pdf(
-                    pdf_path,
-                    pages='all',
-                    multiple_tables=True,
-                    pandas_options={'header': None},
-                    encoding=encoding,
-                    silent=True,
-                    stream=True
-                )
-                break  # Success! Stop trying other encodings
-            except UnicodeDecodeError:
-                continue  # Try next encoding
-            except Exception as e:
-                # Some other error, not encoding-related
-                raise e
-        
-        if tables_stream is None:
-            raise Exception("Could not read PDF with any encoding")
+        tables, tables_stream = read_pdf_tables(pdf_path)
 
-        for encoding in encodings:
-            try:
-                tables = tabula.read_pdf(
-                    pdf_path,
-                    pages='all',
-                    multiple_tables=True,
-                    pandas_options={'header': None},
-                    encoding=encoding,
-                    silent=True
-                )
-                break  # Success! Stop trying other encodings
-            except UnicodeDecodeError:
-                continue  # Try next encoding
-            except Exception as e:
-                # Some other error, not encoding-related
-                raise e
-        
-        if tables is None:
-            raise Exception("Could not read PDF with any encoding")
-     
-     
-        # Identify tables by looking for identifying text
-        table1_df = None
-        table3_df = None
-        table4_df = None
-        
-        
-        for i, table in enumerate(tables):
-            # Convert first few rows to string to search
-            table_text = table.to_string().lower()
-
-            # Look for Table 1 identifiers
-            if 'refinance with fha' in table_text and 'delinquency' not in table_text:
-                table1_df = table.copy()
-             
-            # Look for Table 3 identifiers
-            if 'property improvement' in table_text:
-                table3_df = table.copy()
-                break
-
-        # Stream works better for table 4                
-        for i, table in enumerate(tables_stream):
-            # Convert first few rows to string to search
-            table_text = table.to_string().lower()
-
-            # Look for Table 4 identifiers
-            if 'first-time homebuyer' in table_text or 'first time homebuyer' in table_text:
-                table4_df = table.copy()
-                break
-        
-        if table1_df is None:
-            print(f"  Warning: Table 1 not found in {os.path.basename(pdf_path)}")
-
-        if table3_df is None:
-            print(f"  Warning: Table 3 not found in {os.path.basename(pdf_path)}")
-
-        if table4_df is None:
-            print(f"  Warning: Table 4 not found in {os.path.basename(pdf_path)}")
-        
-        # Clean the dataframes
-        if table1_df is not None:
-            table1_df = table1_df.dropna(how='all')  # Remove empty rows
-        if table3_df is not None:
-            table3_df = table3_df.dropna(how='all')  # Remove empty rows
-        if table4_df is not None:
-            table4_df = table4_df.dropna(how='all')  # Remove empty rows
+        # Resolve report date (manifest, filename, then cover page)
+        fndate = resolve_report_date(pdf_path, date_manifest)
         
-        # Extract date from filename
-        fndate = extract_date_from_filename(os.path.basename(pdf_path))
-        
-        # Parse the table structure
-        data_dict1 = {'date': fndate, 'filename': os.path.basename(pdf_path)}
-        data_dict3 = data_dict1.copy()
-        data_dict4 = data_dict1.copy()
-        
-        if table1_df is not None:
-            data_dict1 = extract_table1_from_pdf(data_dict1, table1_df, pdf_path)
-        else:
-            data_dict1 = None
-            
-        if table3_df is not None:
-            data_dict3 = extract_table3_from_pdf(data_dict3, table3_df, pdf_path)
-        else:
-            data_dict3 = None
-            
-        if table4_df is not None:
-            data_dict4 = extract_table4_from_pdf(data_dict4, table4_df, pdf_path)
-        else:
-            data_dict4 = None
-
-        return data_dict1, data_dict3, data_dict4
+        return parse_pdf_tables(pdf_path, fndate, tables, tables_stream, prior_values)
         
     except Exception as e:
         print(f"  Error processing {os.path.basename(pdf_path)}: {e}")
@@ -390,13 +582,99 @@ def get_percentage(row):
     return None
 
 
-def extract_table4_from_pdf(data_dict, table4_df, pdf_path):
+def get_numbers(row):
+    """Extract every numeric value from row, in column order, as cleaned strings"""
+    numbers = []
+    for x in row:
+        if pd.isna(x):
+            continue
+        s = str(x).strip()
+        if s == '-':
+            numbers.append('0')
+            continue
+        s = s.replace(',', '').replace('$', '').replace('%', '').strip()
+        # Handle accounting negatives like "(123)"
+        if s.startswith('(') and s.endswith(')'):
+            s = '-' + s[1:-1]
+        try:
+            float(s)
+            numbers.append(s)
+        except ValueError:
+            continue
+    return numbers
+
+
+def find_header_periods(table4_df, report_date):
+    """
+    Find the row of month column headers in Table 4 and return its periods
+    in column order, e.g. [2021-12-01, 2021-11-01, 2020-12-01]. Empty if none.
+    Only a row whose first month is the report month counts as the header
+    (the current month is the first numeric column), so titles like
+    "Fiscal Year 2022 (Oct 2021 - Mar 2022)" are not mistaken for it.
+    """
+    if report_date is None:
+        return []
+
+    for idx, row in table4_df.iterrows():
+        row_text = ' '.join([str(x) for x in row if pd.notna(x)])
+        matches = PERIOD_RE.findall(row_text)
+        if len(matches) >= 2:
+            periods = []
+            for month_str, year in matches:
+                year = int(year) + 2000 if len(year) == 2 else int(year)
+                periods.append(datetime(year, MONTH_MAP[month_str.lower()], 1))
+            if periods[0] == report_date:
+                return periods
+    return []
+
+
+def record_prior_values(prior_values, data_dict, before, row, periods):
+    """
+    For the metrics set from this row, append the values in the other month
+    columns to prior_values. Rows whose numbers don't line up with the headers,
+    or whose current-month column disagrees with the parsed value, are skipped.
+    Returns True if the row set a metric and lined up with the headers.
+    """
+    report_date = data_dict['date']
+    metrics = [k for k in data_dict if k not in before or before[k] != data_dict[k]]
+    if not metrics or report_date not in periods:
+        return False
+
+    numbers = get_numbers(row)
+    if len(numbers) != len(periods):
+        return False
+
+    for metric in metrics:
+        current = data_dict[metric]
+        if float(numbers[periods.index(report_date)]) != float(current):
+            continue
+        for s, period in zip(numbers, periods):
+            if period == report_date:
+                continue
+            prior_values.append({
+                'filename': data_dict['filename'],
+                'report_date': report_date.strftime('%Y-%m-%d'),
+                'metric': metric,
+                'period': period.strftime('%Y-%m-%d'),
+                # Same type as the current value: float for shares, string for counts
+                'value': float(s) if isinstance(current, float) else s
+            })
+
+    return True
+
+
+def extract_table4_from_pdf(data_dict, table4_df, pdf_path, prior_values=None):
     """
     Extract Table 4 (Single-Family Insured Mortgage Endorsement Characteristic Shares)
+    If prior_values is a list, the prior-period columns are appended to it
+    (see record_prior_values).
     """
+    recorded = len(prior_values) if prior_values is not None else 0
     try:
         # We need to find the column with the current month data
         # This is typically the first numeric column after the row labels
+        periods = find_header_periods(table4_df, data_dict['date']) if prior_values is not None else []
+        aligned = 0
         
         for idx, row in table4_df.iterrows():
             row_text = ' '.join([str(x).lower() for x in row if pd.notna(x)])
@@ -410,6 +688,8 @@ def extract_table4_from_pdf(data_dict, table4_df, pdf_path):
             # Sometimes Tabula doesn't split columns properly
             if len(row) < 3:
                 row = row[0].split()
+
+            before = dict(data_dict)
             
             # Total Endorsement Count
             if 'total endorsement count' in row_text:
@@ -530,16 +810,63 @@ def extract_table4_from_pdf(data_dict, table4_df, pdf_path):
                 pct = get_percentage(row)
                 if pct:
                     data_dict['manufactured_housing_pct'] = pct
+
+            # Prior-period columns, aligned with the month headers
+            if periods and record_prior_values(prior_values, data_dict, before, row, periods):
+                aligned += 1
+
+        if periods and not aligned:
+            print(f"  Warning: Table 4 month headers found in {os.path.basename(pdf_path)} "
+                  f"but no row lines up with them; prior-period values not captured")
         
         return data_dict
     
     except Exception as e:
+        # Don't keep prior-period values from a table that failed to parse
+        if prior_values is not None:
+            del prior_values[recorded:]
         print(f"  Error processing Table 4 in {os.path.basename(pdf_path)}: {e}")
         print("\nTable:\n", table4_df)
         print("\nrow_text: ", row_text)
         return None
 
 
+def row_to_json(data_dict):
+    """
+    Make an extracted row JSON serializable for the parsed cache.
+    """
+    if data_dict is None:
+        return None
+    row = dict(data_dict)
+    if isinstance(row.get('date'), datetime):
+        row['date'] = row['date'].strftime('%Y-%m-%d')
+    return row
+
+
+def row_from_json(row):
+    """
+    Inverse of row_to_json.
+    """
+    if row is None:
+        return None
+    data_dict = dict(row)
+    if data_dict.get('date'):
+        data_dict['date'] = datetime.strptime(data_dict['date'], '%Y-%m-%d')
+    return data_dict
+
+
+def build_table(rows, columns):
+    """
+    DataFrame of extracted rows in the published column order; columns not in
+    the list (new metrics) follow in order of first appearance.
+    """
+    if not rows:
+        return pd.DataFrame()
+    df = pd.DataFrame(rows)
+    ordered = [c for c in columns if c in df.columns]
+    return df[ordered + [c for c in df.columns if c not in ordered]]
+
+
 def extract_tables_from_all_pdfs(out_path, pdf_path):
     """
     Extract Tables 1, 3, and 4 data from all PDFs in a directory and combine into DataFrames.
@@ -562,12 +889,40 @@ def extract_tables_from_all_pdfs(out_path, pdf_path):
     all_data1 = []
     all_data3 = []
     all_data4 = []
+    all_prior = []
+    undated = []
+
+    date_manifest = load_date_manifest(pdf_dir)
+    parsed_cache = load_json(pdf_dir / PARSED_CACHE)
     
     i = 0
     for pdf_file in pdf_files:
         i = i + 1
-        print(f"Processing: {i} {pdf_file.name}")
-        data1, data3, data4 = extract_tables_from_pdf(str(pdf_file))
+
+        # Reuse results parsed from this exact file by this parser version
+        sha256 = file_sha256(pdf_file)
+        entry = parsed_cache.get(pdf_file.name)
+        if entry and entry.get('sha256') == sha256 and entry.get('parser') == PARSER_VERSION:
+            print(f"Cached: {i} {pdf_file.name}")
+            data1, data3, data4 = (row_from_json(entry[tab]) for tab in ('tab1', 'tab3', 'tab4'))
+            prior = entry['prior']
+        else:
+            print(f"Processing: {i} {pdf_file.name}")
+            prior = []
+            data1, data3, data4 = extract_tables_from_pdf(str(pdf_file), date_manifest, prior)
+            if any(d is not None and d['date'] is None for d in (data1, data3, data4)):
+                undated.append(pdf_file.name)
+                continue
+            if data1 or data3 or data4:  # Errors are retried on the next run
+                parsed_cache[pdf_file.name] = {
+                    'sha256': sha256, 'parser': PARSER_VERSION,
+                    'tab1': row_to_json(data1), 'tab3': row_to_json(data3), 'tab4': row_to_json(data4),
+                    'prior': prior
+                }
+        # Prior-period values only count alongside a Table 4 row from the same report
+        if not (data4 and len(data4) > 2):
+            prior = []
+        all_prior.extend(prior)
         
         if data1 and len(data1) > 2:  # More than just date and filename
             all_data1.append(data1)
@@ -577,12 +932,22 @@ def extract_tables_from_all_pdfs(out_path, pdf_path):
             
         if data4 and len(data4) > 2:  # More than just date and filename
             all_data4.append(data4)
-      
+
+    save_date_manifest(pdf_dir, date_manifest)
+    save_json(pdf_dir / PARSED_CACHE, parsed_cache, sort_keys=False)
+
+    # A row without a report month would silently corrupt the published tables
+    if undated:
+        raise Exception(f"Could not determine report date for: {', '.join(undated)}")
    
     # Create DataFrames
-    df1 = pd.DataFrame(all_data1) if all_data1 else pd.DataFrame()
-    df3 = pd.DataFrame(all_data3) if all_data3 else pd.DataFrame()
-    df4 = pd.DataFrame(all_data4) if all_data4 else pd.DataFrame()
+    df1 = build_table(all_data1, TAB1_COLUMNS)
+    df3 = build_table(all_data3, TAB3_COLUMNS)
+    df4 = build_table(all_data4, TAB4_COLUMNS)
+
+    # Index Table 4 by (metric, period) across reports, fill months with no report
+    if not df4.empty:
+        df4 = update_period_index(out_path, df4, all_prior)
     
     # Sort by date
     if not df1.empty and 'date' in df1.columns:
@@ -630,6 +995,9 @@ def main(out_path, pdf_path, output_file = "fha_data"):
         df4.to_csv(out_path+output_file+"_tab4_"+date.today().isoformat()+".bak", index=False)  # archive
         df4.to_csv(out_path+output_file+"_tab4.csv", index=False)
         print(f"\nTable 4 Data saved to: {out_path+output_file+'_tab4.csv'}")
+
+    # Derived series (rates, YoY growth, purchase/refinance mix), new months only
+    update_analytics(out_path, df1, df4, output_file)
  
         
     # Display summary statistics
@@ -0,0 +1,493 @@
+# -*- coding: utf-8 -*-
+"""
+Regression check for ExtractFHA3
+
+Replays extraction over a fixture set and diffs every row against the
+committed golden output (output/fha_data_tab1.csv, _tab3.csv, _tab4.csv),
+and the Table 4 prior-period values against output/fha_data_tab4_index.csv.
+Each file must also stay within a time and memory budget, so changes to the
+extractor can't silently alter extracted values or slow the monthly job down.
+Rows are also passed through the parsed cache (pdf/parsed_cache.json), and the
+CSV written from them must be byte-identical to the CSV written from fresh rows
+and keep the golden column order.
+
+Fixtures are either
+  * PDFs (default ./pdf/), replayed through tabula, or
+  * recorded tabula output (./fixtures/*.pkl), replayed without Java.
+
+The committed corpus is the list of reports in fixtures/fixtures.txt. Record
+the ones not yet recorded from the PDFs (needs Java), then replay them:
+    python RegressFHA.py --pdf ./pdf/ --record ./fixtures/
+    python RegressFHA.py --fixtures ./fixtures/
+A listed report without a recording counts as a failure. Recordings keep the
+cover page text, so the report date is resolved again on replay (filename,
+then cover page) and checked against the golden date. The cover-date rules
+are also checked on the synthetic pages in COVER_CASES.
+
+After an intentional change to extracted values, rewrite the golden rows of
+the fixture reports from the current extractor and commit the result:
+    python RegressFHA.py --fixtures ./fixtures/ --update-golden
+
+Memory is measured with tracemalloc, i.e. Python-side allocations only; the
+JVM used by tabula is not counted. Exits non-zero on any diff or budget breach.
+"""
+
+import argparse
+import csv
+import json
+import pickle
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from ExtractFHA3 import (read_pdf_tables, parse_pdf_tables, resolve_report_date,
+                         read_cover_text, cover_text, extract_date_from_filename,
+                         extract_date_from_cover_text,
+                         row_to_json, row_from_json, build_table,
+                         TAB1_COLUMNS, TAB3_COLUMNS, TAB4_COLUMNS)
+from ReviseFHA import BACKFILL_COLUMN, INDEX_COLUMNS
+
+TABLES = ['tab1', 'tab3', 'tab4']
+TABLE_COLUMNS = dict(zip(TABLES, [TAB1_COLUMNS, TAB3_COLUMNS, TAB4_COLUMNS]))
+
+# Reports that make up the committed fixture corpus
+FIXTURE_LIST = "fixtures.txt"
+
+# Synthetic cover pages (filename, page 1 cells, expected report month). The
+# real page 1 of prorepma2013ext20130718.pdf is replayed from its recording.
+COVER_CASES = [
+    # Fiscal-year range on the title line: latest month before the July release
+    ('prorepma2013ext20130718.pdf',
+     [['FHA Single Family Production Report October 2012 - May 2013'], ['Released July 2013']],
+     '2013-05-01'),
+    # Month and year split over cells with an empty cell between them
+    ('prorepma2013ext20130718.pdf',
+     [['Production Report', 'May', None, '2013'], [None, None, None, None]],
+     '2013-05-01'),
+    # Title line wins over other months on the page
+    ('report.pdf',
+     [['FHA Production Report', 'May 2013'], ['Data as of June 2013']],
+     '2013-05-01'),
+    # A range without a release date is ambiguous
+    ('report.pdf',
+     [['Production Report October 2012 - May 2013']],
+     None),
+]
+
+
+def load_golden(out_path, output_file="fha_data"):
+    """
+    Load the committed CSVs as {table: {filename: row}}, all values as strings.
+    golden['columns'] maps table to its header, golden['prior'] maps filename
+    to its set of (metric, period, value) prior values.
+    """
+    golden = {'columns': {}}
+    for tab in TABLES:
+        golden_file = Path(out_path) / f"{output_file}_{tab}.csv"
+        golden[tab] = {}
+        if not golden_file.exists():
+            print(f"  Warning: golden file {golden_file} not found")
+            continue
+        with open(golden_file, newline='') as f:
+            reader = csv.DictReader(f)
+            golden['columns'][tab] = [c for c in reader.fieldnames if c != BACKFILL_COLUMN]
+            for row in reader:
+                # Backfilled rows come from another report's prior-period column
+                if row.get(BACKFILL_COLUMN):
+                    continue
+                golden[tab][row['filename']] = row
+
+    golden['prior'] = {}
+    index_file = Path(out_path) / f"{output_file}_tab4_index.csv"
+    if not index_file.exists():
+        print(f"  Warning: golden file {index_file} not found, prior-period values not checked")
+        golden['prior'] = None
+        return golden
+    with open(index_file, newline='') as f:
+        for row in csv.DictReader(f):
+            if row['current'] == 'False':
+                golden['prior'].setdefault(row['filename'], set()).add(
+                    (row['metric'], row['period'], row['value']))
+
+    return golden
+
+
+def format_value(value):
+    """
+    Format an extracted value the way DataFrame.to_csv writes it.
+    """
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, float):
+        return '' if pd.isna(value) else repr(value)
+    return str(value)
+
+
+def diff_row(tab, filename, extracted, golden_row):
+    """
+    Compare one extracted dict with its golden row. Returns a list of messages.
+    """
+    if golden_row is None and not extracted:
+        return []
+    if golden_row is None:
+        return [f"{tab} {filename}: extracted a row that is not in the golden output"]
+    if not extracted:
+        return [f"{tab} {filename}: golden row not extracted"]
+
+    diffs = []
+    for col in golden_row:
+        expected = golden_row[col]
+        got = format_value(extracted.get(col))
+        if got != expected:
+            diffs.append(f"{tab} {filename} {col}: expected {expected!r}, got {got!r}")
+
+    for col in extracted:
+        if col not in golden_row:
+            diffs.append(f"{tab} {filename}: new column {col!r} = {format_value(extracted[col])!r}")
+
+    return diffs
+
+
+def diff_prior(filename, prior_values, golden_prior):
+    """
+    Compare the prior-period values parsed from one report with the golden index.
+    """
+    extracted = {(p['metric'], p['period'], format_value(p['value'])) for p in prior_values}
+    golden_prior = golden_prior.get(filename, set())
+
+    diffs = []
+    for metric, period, value in sorted(golden_prior - extracted):
+        diffs.append(f"prior {filename} {metric} {period}: expected {value!r}, not extracted")
+    for metric, period, value in sorted(extracted - golden_prior):
+        diffs.append(f"prior {filename} {metric} {period}: extracted {value!r}, not in the golden index")
+    return diffs
+
+
+def diff_cached_rerun(tab, filename, extracted, golden_columns):
+    """
+    Pass a row through the parsed cache the way a rerun does and compare the
+    CSV written from it with the CSV from the fresh row, byte for byte.
+    """
+    cached = row_from_json(json.loads(json.dumps(row_to_json(extracted))))
+    fresh_csv = build_table([extracted], TABLE_COLUMNS[tab]).to_csv(index=False, date_format='%Y-%m-%d')
+    cached_csv = build_table([cached], TABLE_COLUMNS[tab]).to_csv(index=False, date_format='%Y-%m-%d')
+
+    diffs = []
+    if cached_csv != fresh_csv:
+        diffs.append(f"{tab} {filename}: CSV from the parsed cache differs from a fresh parse")
+    header = fresh_csv.split('\n', 1)[0].split(',')
+    if golden_columns and header != [c for c in golden_columns if c in header]:
+        diffs.append(f"{tab} {filename}: column order {header} does not match the golden output")
+    return diffs
+
+
+def load_fixture_list(fixture_path):
+    """
+    Report filenames listed in fixtures.txt (blank lines and # comments ignored).
+    """
+    list_file = Path(fixture_path) / FIXTURE_LIST
+    if not list_file.exists():
+        return []
+    with open(list_file) as f:
+        lines = [line.split('#')[0].strip() for line in f]
+    return [line for line in lines if line]
+
+
+def check_cover_dates():
+    """
+    Run the cover-date rules over COVER_CASES. Returns the number of failures.
+    """
+    failures = 0
+    for filename, cells, expected in COVER_CASES:
+        text = cover_text([pd.DataFrame(cells)])
+        got = extract_date_from_cover_text(text, filename)
+        got = got.strftime('%Y-%m-%d') if got else None
+        if got != expected:
+            print(f"FAIL cover {filename} {text!r}: expected {expected}, got {got}")
+            failures += 1
+    return failures
+
+
+def fixture_date(filename, cover):
+    """
+    Report date of a recorded fixture, resolved as resolve_report_date does
+    without a manifest: filename first, then the recorded cover page text.
+    """
+    return extract_date_from_filename(filename) or extract_date_from_cover_text(cover, filename)
+
+
+def read_fixture(pdf_file):
+    """
+    Run tabula and resolve the report date for one PDF. The date manifest is
+    not used, so the filename and cover-page paths are exercised every time.
+    """
+    tables, tables_stream = read_pdf_tables(str(pdf_file))
+    fndate = resolve_report_date(str(pdf_file))
+    return fndate, tables, tables_stream
+
+
+def load_cached_fixture(fixture_file):
+    """
+    Read (fndate, tables, tables_stream) from a recorded fixture.
+    """
+    if not fixture_file.exists():
+        raise FileNotFoundError(f"{fixture_file} has not been recorded")
+    with open(fixture_file, 'rb') as f:
+        filename, tables, tables_stream, cover = pickle.load(f)
+    return fixture_date(filename, cover), tables, tables_stream
+
+
+def iter_pdf_fixtures(pdf_path):
+    """
+    Yield (filename, load) for every PDF; load() returns (fndate, tables, tables_stream).
+    Reading is deferred to load() so one bad PDF can't stop the iteration.
+    """
+    for pdf_file in sorted(Path(pdf_path).glob("*.pdf")):
+        yield pdf_file.name, lambda pdf_file=pdf_file: read_fixture(pdf_file)
+
+
+def iter_cached_fixtures(fixture_path):
+    """
+    Yield (filename, load) for every report in fixtures.txt, plus any other
+    recorded fixture. A listed report that was never recorded fails on load().
+    """
+    fixture_dir = Path(fixture_path)
+    names = load_fixture_list(fixture_dir)
+    names += [f.stem + ".pdf" for f in sorted(fixture_dir.glob("*.pkl"))
+              if f.stem + ".pdf" not in names]
+
+    for name in names:
+        fixture_file = fixture_dir / (Path(name).stem + ".pkl")
+        yield name, lambda fixture_file=fixture_file: load_cached_fixture(fixture_file)
+
+
+def record_fixtures(pdf_path, fixture_path):
+    """
+    Record tabula output for every report in fixtures.txt that has no fixture
+    yet. Returns the number of reports that could not be recorded.
+    """
+    failures = 0
+    for name in load_fixture_list(fixture_path):
+        fixture_file = Path(fixture_path) / (Path(name).stem + ".pkl")
+        if fixture_file.exists():
+            continue
+
+        pdf_file = Path(pdf_path) / name
+        try:
+            tables, tables_stream = read_pdf_tables(str(pdf_file))
+            cover = read_cover_text(str(pdf_file))
+        except Exception as e:
+            print(f"  ✗ Failed to record {name}: {e}")
+            failures += 1
+            continue
+
+        with open(fixture_file, 'wb') as f:
+            pickle.dump((name, tables, tables_stream, cover), f)
+        print(f"  ✓ Recorded: {fixture_file}")
+
+    return failures
+
+
+def run_regression(fixtures, golden, max_seconds, max_mb):
+    """
+    Parse every fixture, diff against the golden rows and check the budgets.
+    Returns the number of failures.
+    """
+    failures = 0
+    seen = {tab: set() for tab in TABLES}
+    i = 0
+
+    for filename, load in fixtures:
+        i = i + 1
+        messages = []
+
+        # Time and memory include the tabula call when replaying PDFs
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            fndate, tables, tables_stream = load()
+            prior = []
+            rows = parse_pdf_tables(filename, fndate, tables, tables_stream, prior)
+        except Exception as e:
+            messages.append(f"{filename}: {type(e).__name__}: {e}")
+            rows = None
+        finally:
+            elapsed = time.perf_counter() - start
+            peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+
+        if rows is not None:
+            for tab, extracted in zip(TABLES, rows):
+                # Same filter as extract_tables_from_all_pdfs: more than date and filename
+                if extracted and len(extracted) <= 2:
+                    extracted = None
+                seen[tab].add(filename)
+                messages += diff_row(tab, filename, extracted, golden[tab].get(filename))
+                if extracted:
+                    messages += diff_cached_rerun(tab, filename, extracted, golden['columns'].get(tab))
+
+            # Same filter as extract_tables_from_all_pdfs: only with a Table 4 row
+            if not (rows[2] and len(rows[2]) > 2):
+                prior = []
+            if golden['prior'] is not None:
+                messages += diff_prior(filename, prior, golden['prior'])
+
+        if elapsed > max_seconds:
+            messages.append(f"{filename}: took {elapsed:.2f}s (budget {max_seconds}s)")
+        if peak_mb > max_mb:
+            messages.append(f"{filename}: peak memory {peak_mb:.1f}MB (budget {max_mb}MB)")
+
+        status = "FAIL" if messages else "ok"
+        print(f"{status:4} {i} {filename}  {elapsed:.2f}s  {peak_mb:.1f}MB")
+        for message in messages:
+            print(f"     {message}")
+        failures += len(messages)
+
+    if i == 0:
+        print("No fixtures found.")
+        return 1
+
+    # Golden rows whose report was not in the fixture set are only reported
+    for tab in TABLES:
+        missing = set(golden[tab]) - seen[tab]
+        if missing:
+            print(f"\n{tab}: {len(missing)} golden rows have no fixture (not checked)")
+
+    return failures
+
+
+def extract_fixtures(fixtures):
+    """
+    Parse every fixture. Returns {table: {filename: row}}, {filename: prior values}
+    and the number of fixtures that failed to parse.
+    """
+    extracted = {tab: {} for tab in TABLES}
+    prior_values = {}
+    failures = 0
+
+    for filename, load in fixtures:
+        try:
+            fndate, tables, tables_stream = load()
+            prior = []
+            rows = parse_pdf_tables(filename, fndate, tables, tables_stream, prior)
+        except Exception as e:
+            print(f"  ✗ {filename}: {type(e).__name__}: {e}")
+            failures += 1
+            continue
+
+        for tab, row in zip(TABLES, rows):
+            extracted[tab][filename] = row if row and len(row) > 2 else None
+        prior_values[filename] = prior if extracted['tab4'][filename] else []
+
+    return extracted, prior_values, failures
+
+
+def write_rows(csv_file, fieldnames, rows):
+    """
+    Write rows the way DataFrame.to_csv does (no index, '\n' line endings).
+    """
+    with open(csv_file, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def update_golden(fixtures, out_path, output_file="fha_data"):
+    """
+    Replace the golden rows (and golden prior-period values) of the fixture
+    reports with what the current extractor produces. Rows of other reports
+    are left as they are; the next monthly run regenerates the full output.
+    Returns the number of fixtures that failed to parse.
+    """
+    extracted, prior_values, failures = extract_fixtures(fixtures)
+
+    for tab in TABLES:
+        golden_file = Path(out_path) / f"{output_file}_{tab}.csv"
+        if not golden_file.exists():
+            print(f"  Warning: golden file {golden_file} not found, not updated")
+            continue
+        with open(golden_file, newline='') as f:
+            reader = csv.DictReader(f)
+            fieldnames = list(reader.fieldnames)
+            rows = list(reader)
+
+        updated = 0
+        for filename, row in extracted[tab].items():
+            old = [r for r in rows if r['filename'] == filename and not r.get(BACKFILL_COLUMN)]
+            new = None
+            if row:
+                new = {col: format_value(value) for col, value in row.items()}
+                fieldnames += [col for col in new if col not in fieldnames]
+            if (old[0] if old else None) == new:
+                continue
+            rows = [r for r in rows if r not in old] + ([new] if new else [])
+            updated += 1
+
+        rows.sort(key=lambda r: r['date'])
+        write_rows(golden_file, fieldnames, rows)
+        print(f"  {golden_file}: {updated} rows updated")
+
+    index_file = Path(out_path) / f"{output_file}_tab4_index.csv"
+    if not index_file.exists():
+        print(f"  Warning: golden file {index_file} not found, prior-period values not updated")
+        return failures
+    with open(index_file, newline='') as f:
+        rows = [r for r in csv.DictReader(f)
+                if r['current'] == 'True' or r['filename'] not in prior_values]
+    for prior in prior_values.values():
+        rows += [{'metric': p['metric'], 'period': format_value(p['period']), 'value': format_value(p['value']),
+                  'filename': p['filename'], 'report_date': format_value(p['report_date']), 'current': 'False'}
+                 for p in prior]
+    rows.sort(key=lambda r: (r['metric'], r['period'], r['report_date']))
+    write_rows(index_file, INDEX_COLUMNS, rows)
+    print(f"  {index_file}: prior-period values of {len(prior_values)} reports replaced")
+
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pdf', default="./pdf/", help="directory of fixture PDFs")
+    parser.add_argument('--fixtures', help="directory of cached tabula output; replaces --pdf")
+    parser.add_argument('--record', help="record tabula output for --pdf into this fixture directory and exit")
+    parser.add_argument('--golden', default="./output/", help="directory of golden CSVs")
+    parser.add_argument('--update-golden', action='store_true',
+                        help="rewrite the golden rows of the fixture reports from the current extractor and exit")
+    parser.add_argument('--max-seconds', type=float, default=60.0, help="per-file time budget")
+    parser.add_argument('--max-mb', type=float, default=200.0, help="per-file Python memory budget")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        failures = record_fixtures(args.pdf, args.record)
+        return 1 if failures else 0
+
+    if args.fixtures:
+        fixtures = iter_cached_fixtures(args.fixtures)
+    else:
+        fixtures = iter_pdf_fixtures(args.pdf)
+
+    if args.update_golden:
+        failures = update_golden(fixtures, args.golden)
+        return 1 if failures else 0
+
+    golden = load_golden(args.golden)
+
+    failures = check_cover_dates()
+    failures += run_regression(fixtures, golden, args.max_seconds, args.max_mb)
+
+    print("\n" + "="*50)
+    print(f"Regression failures: {failures}")
+    print("="*50)
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Cross-report consistency index for Table 4
+
+Each report states the current month and, in its other month columns, figures
+for prior periods. This indexes every value by (metric, period) across all
+reports, so that
+  * revisions (a later report restating a prior period) are detected, and
+  * months missing from Table 4 are backfilled from a later report's
+    prior-period column instead of re-parsing PDFs. Backfilled rows have
+    backfilled=True and the source report as filename.
+
+The index is saved to output/fha_data_tab4_index.csv.
+"""
+
+import pandas as pd
+
+INDEX_COLUMNS = ['metric', 'period', 'value', 'filename', 'report_date', 'current']
+
+# Column marking Table 4 rows taken from a later report's prior-period column
+BACKFILL_COLUMN = 'backfilled'
+
+
+def build_period_index(df4, prior_values):
+    """
+    One row per (metric, period, report): current values from df4 plus the
+    prior-period values captured by extract_table4_from_pdf.
+    """
+    current = df4
+    if BACKFILL_COLUMN in df4.columns:
+        current = df4[df4[BACKFILL_COLUMN] != True].drop(columns=BACKFILL_COLUMN)
+    current = current.melt(id_vars=['date', 'filename'], var_name='metric', value_name='value')
+    current = current.dropna(subset=['value'])
+    current['period'] = pd.to_datetime(current['date'])
+    current['report_date'] = current['period']
+    current['current'] = True
+
+    prior = pd.DataFrame(prior_values, columns=['filename', 'report_date', 'metric', 'period', 'value'])
+    prior['period'] = pd.to_datetime(prior['period'])
+    prior['report_date'] = pd.to_datetime(prior['report_date'])
+    prior['current'] = False
+
+    index = pd.concat([current[INDEX_COLUMNS], prior[INDEX_COLUMNS]], ignore_index=True)
+    return index.sort_values(['metric', 'period', 'report_date']).reset_index(drop=True)
+
+
+def find_revisions(index):
+    """
+    (metric, period) pairs reported with different values, with the first and
+    latest value and the reports they came from.
+    """
+    index = index.assign(number=pd.to_numeric(index['value'], errors='coerce'))
+    index = index.dropna(subset=['number'])
+
+    grouped = index.groupby(['metric', 'period'])
+    revised = grouped['number'].transform('nunique') > 1
+    if not revised.any():
+        return pd.DataFrame(columns=['metric', 'period', 'first_value', 'first_report',
+                                     'latest_value', 'latest_report'])
+
+    revisions = index[revised].groupby(['metric', 'period']).agg(
+        first_value=('number', 'first'), first_report=('filename', 'first'),
+        latest_value=('number', 'last'), latest_report=('filename', 'last'))
+    return revisions.reset_index()
+
+
+def backfill_missing(df4, index):
+    """
+    Add Table 4 rows for months with no report, taken from the prior-period
+    columns of the earliest later report that covers the month.
+    """
+    dates = pd.to_datetime(df4['date']).dropna()
+    if dates.empty:
+        return df4
+
+    months = pd.date_range(dates.min(), dates.max(), freq='MS')
+    missing = months.difference(dates)
+
+    prior = index[~index['current']]
+    rows = []
+    for month in missing:
+        candidates = prior[prior['period'] == month]
+        if candidates.empty:
+            continue
+        source = candidates[candidates['report_date'] == candidates['report_date'].min()]
+        row = {'date': month.to_pydatetime(), 'filename': source['filename'].iloc[0], BACKFILL_COLUMN: True}
+        row.update(dict(zip(source['metric'], source['value'])))
+        rows.append(row)
+        print(f"  Backfilled Table 4 for {month:%Y-%m} from {source['filename'].iloc[0]}")
+
+    if not rows:
+        return df4
+
+    return pd.concat([df4, pd.DataFrame(rows)], ignore_index=True)
+
+
+def update_period_index(out_path, df4, prior_values, output_file="fha_data"):
+    """
+    Build and save the (metric, period) index, report revisions and return
+    df4 with missing months backfilled.
+    """
+    index = build_period_index(df4, prior_values)
+    index.to_csv(out_path + output_file + "_tab4_index.csv", index=False, date_format='%Y-%m-%d')
+
+    revisions = find_revisions(index)
+    if not revisions.empty:
+        print(f"\nTable 4 revisions in later reports: {len(revisions)}")
+        print(revisions.to_string(index=False))
+
+    return backfill_missing(df4, index)
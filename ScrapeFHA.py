@@ -10,6 +10,7 @@ from urllib.parse import urljoin
 import os
 from pathlib import Path
 import time
+from StateFHA import verify_state, load_json, save_json, manifest_entry, DOWNLOAD_MANIFEST
 
 def download_fha_reports(pdf_path):
     """
@@ -17,6 +18,11 @@ def download_fha_reports(pdf_path):
  
     """
     os.makedirs(pdf_path, exist_ok=True)
+
+    # Check PDFs restored from a previous run; corrupt ones are downloaded again
+    verify_state(pdf_path)
+    manifest_file = os.path.join(pdf_path, DOWNLOAD_MANIFEST)
+    manifest = load_json(manifest_file)
     
     # URL of the page
     url = "https://www.hud.gov/hud-partners/fha-production-report"
@@ -55,8 +61,8 @@ def download_fha_reports(pdf_path):
             filename = pdf_url.split('/')[-1]
             filepath = os.path.join(pdf_path, filename)
             
-            # Skip if file already exists
-            if os.path.exists(filepath):
+            # Skip if file already exists and passed the state check
+            if os.path.exists(filepath) and filename in manifest:
                 print(f"Skipping (already exists): {filename}")
                 skipped += 1
                 continue
@@ -65,10 +71,18 @@ def download_fha_reports(pdf_path):
                 print(f"Downloading: {filename}")
                 pdf_response = requests.get(pdf_url, timeout=30)
                 pdf_response.raise_for_status()
+
+                if not pdf_response.content.startswith(b'%PDF-'):
+                    raise Exception("response is not a PDF")
                 
-                # Save PDF
-                with open(filepath, 'wb') as f:
+                # Save PDF; write to a temporary file first so an interrupted
+                # download never leaves a truncated PDF behind
+                with open(filepath + ".part", 'wb') as f:
                     f.write(pdf_response.content)
+                os.replace(filepath + ".part", filepath)
+
+                manifest[filename] = manifest_entry(filepath, pdf_url)
+                save_json(manifest_file, manifest)
                 
                 downloaded += 1
                 print(f"  ✓ Saved to: {filepath}")
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Restorable pipeline state
+
+Everything ScrapeFHA and ExtractFHA3 need to skip work on the next run lives
+in one directory (default ./pdf/), so a CI cache or a local copy can persist
+it between runs:
+
+    pdf/
+      *.pdf                   downloaded FHA production reports
+      download_manifest.json  filename -> {url, size, sha256, downloaded}   (ScrapeFHA)
+      date_manifest.json      filename -> {size, date, source, parser}      (ExtractFHA3)
+      parsed_cache.json       filename -> {sha256, parser, tab1, tab3, tab4, prior} (ExtractFHA3)
+
+verify_state() checks the PDFs against the download manifest. Corrupt or
+truncated files are deleted so they are downloaded again, and cache entries
+for missing or changed files are dropped. Run it directly to check a
+restored directory:
+    python StateFHA.py ./pdf/
+"""
+
+import hashlib
+import json
+import os
+import sys
+from datetime import date
+from pathlib import Path
+
+DOWNLOAD_MANIFEST = "download_manifest.json"
+PARSED_CACHE = "parsed_cache.json"
+
+
+def file_sha256(filepath):
+    """
+    SHA-256 of a file, read in 1MB chunks.
+    """
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_json(filepath):
+    """
+    Load a JSON state file, or {} if it is missing or unreadable.
+    """
+    if not os.path.exists(filepath):
+        return {}
+
+    try:
+        with open(filepath, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"  Warning: ignoring unreadable {filepath}: {e}")
+        return {}
+
+
+def save_json(filepath, data, sort_keys=True):
+    """
+    Write a JSON state file atomically, so an interrupted run can't leave it half written.
+    Use sort_keys=False where key order matters (parsed rows keep their column order).
+    """
+    tmp_path = str(filepath) + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=1, sort_keys=sort_keys)
+    os.replace(tmp_path, filepath)
+
+
+def manifest_entry(filepath, url=None):
+    """
+    Download manifest entry for a PDF on disk.
+    """
+    return {
+        'url': url,
+        'size': os.path.getsize(filepath),
+        'sha256': file_sha256(filepath),
+        'downloaded': date.today().isoformat()
+    }
+
+
+def verify_state(pdf_path):
+    """
+    Check the state directory against the download manifest and repair it.
+    Returns the number of problems found.
+    """
+    pdf_dir = Path(pdf_path)
+    if not pdf_dir.exists():
+        return 0
+
+    manifest_file = pdf_dir / DOWNLOAD_MANIFEST
+    manifest = load_json(manifest_file)
+    problems = 0
+
+    for filename, entry in list(manifest.items()):
+        filepath = pdf_dir / filename
+        if not filepath.exists():
+            print(f"  State: {filename} is in the manifest but missing")
+            del manifest[filename]
+            problems += 1
+        elif (filepath.stat().st_size != entry.get('size')
+              or file_sha256(filepath) != entry.get('sha256')):
+            print(f"  State: {filename} does not match the manifest, removing it")
+            filepath.unlink()
+            del manifest[filename]
+            problems += 1
+
+    # PDFs downloaded before the manifest existed
+    for filepath in sorted(pdf_dir.glob("*.pdf")):
+        if filepath.name not in manifest:
+            with open(filepath, 'rb') as f:
+                header = f.read(5)
+            if header != b'%PDF-':
+                print(f"  State: {filepath.name} is not a PDF, removing it")
+                filepath.unlink()
+                problems += 1
+                continue
+            manifest[filepath.name] = manifest_entry(filepath)
+
+    save_json(manifest_file, manifest)
+
+    # Parsed results are only valid for the exact file they came from
+    cache_file = pdf_dir / PARSED_CACHE
+    cache = load_json(cache_file)
+    stale = [f for f, entry in cache.items()
+             if f not in manifest or manifest[f]['sha256'] != entry.get('sha256')]
+    for filename in stale:
+        del cache[filename]
+    if stale:
+        print(f"  State: dropped {len(stale)} stale parsed results")
+        save_json(cache_file, cache, sort_keys=False)
+
+    print(f"State check: {len(manifest)} PDFs, {len(cache)} parsed results, {problems} problems")
+
+    return problems
+
+
+if __name__ == "__main__":
+    pdf_path = sys.argv[1] if len(sys.argv) > 1 else "./pdf/"
+    sys.exit(1 if verify_state(pdf_path) else 0)